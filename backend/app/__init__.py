@@ -2,21 +2,37 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
+from flask_bcrypt import Bcrypt
 import os
 from dotenv import load_dotenv
+from .json_provider import ORJSONProvider
 
 load_dotenv()
 
 db = SQLAlchemy()
 migrate = Migrate()
+bcrypt = Bcrypt()
 
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    database_url = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Reuse connections across requests instead of reconnecting under load
+    engine_options = {
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    if database_url and not database_url.startswith('sqlite'):
+        engine_options['pool_size'] = int(os.getenv('DB_POOL_SIZE', 25))
+        engine_options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW', 25))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
     db.init_app(app)
+    bcrypt.init_app(app)
     CORS(app)
     migrate.init_app(app, db)
 
@@ -1,62 +1,162 @@
+import base64
+import hashlib
+import hmac
 import jwt
+import orjson
 import os
-from datetime import datetime, timedelta
+import time
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from types import SimpleNamespace
 from flask import request, jsonify
 from .models import User
-from . import db
+from . import db, bcrypt
+from .cache import TTLCache
+
+_JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+_JWT_SECRET_KEY_BYTES = _JWT_SECRET_KEY.encode('utf-8') if _JWT_SECRET_KEY else None
+_JWT_EXPIRATION = timedelta(hours=int(os.getenv('JWT_EXPIRATION_HOURS', 24)))
+
+# Recently verified tokens, keyed by their SHA-256 digest so raw tokens are not
+# kept in memory. The short TTL bounds how long a revoked token stays accepted.
+_token_cache = TTLCache(maxsize=10000, ttl=5)
+
+# Detached snapshots of authenticated users, so protected routes skip the users
+# SELECT on cache hits. Role or profile changes show up once the entry expires.
+_user_cache = TTLCache(maxsize=10000, ttl=5)
+
+def _load_current_user(user_id):
+    current_user = _user_cache.get(user_id)
+    if current_user is not None:
+        return current_user
+
+    user = User.query.get(user_id)
+    if not user:
+        return None
+
+    current_user = SimpleNamespace(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role,
+        created_at=user.created_at
+    )
+    _user_cache.set(user_id, current_user)
+    return current_user
+
+# New passwords are hashed with Argon2id (memory-hard, 64 MiB per hash).
+# Accounts created before the switch still carry bcrypt hashes; those are
+# verified with bcrypt and re-hashed with Argon2 on the next successful login.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+# bcrypt only uses the first 72 bytes of a password (and bcrypt>=5 raises on
+# anything longer), so truncate explicitly before checking legacy hashes.
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+def _is_bcrypt_hash(password_hash):
+    return password_hash.startswith(('$2a$', '$2b$', '$2y$'))
 
 def hash_password(password):
-    from flask_bcrypt import Bcrypt
-    bcrypt = Bcrypt()
-    return bcrypt.generate_password_hash(password).decode('utf-8')
+    return _password_hasher.hash(password)
 
 def check_password(password_hash, password):
-    from flask_bcrypt import Bcrypt
-    bcrypt = Bcrypt()
-    return bcrypt.check_password_hash(password_hash, password)
+    if _is_bcrypt_hash(password_hash):
+        return bcrypt.check_password_hash(
+            password_hash,
+            password.encode('utf-8')[:BCRYPT_MAX_PASSWORD_BYTES]
+        )
+    try:
+        return _password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(password_hash):
+    return _is_bcrypt_hash(password_hash) or _password_hasher.check_needs_rehash(password_hash)
 
 def generate_token(user_id):
-    expiration = datetime.utcnow() + timedelta(hours=int(os.getenv('JWT_EXPIRATION_HOURS', 24)))
+    now = datetime.now(timezone.utc)
     
     payload = {
         'user_id': user_id,
-        'exp': expiration,
-        'iat': datetime.utcnow()
+        'exp': now + _JWT_EXPIRATION,
+        'iat': now
     }
     
     token = jwt.encode(
         payload,
-        os.getenv('JWT_SECRET_KEY'),
+        _JWT_SECRET_KEY,
         algorithm='HS256'
     )
     
     return token
 
-def verify_token(token):
+def _b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+def _verify_hs256(token):
+    """
+    Verify an HS256 JWT and return its payload, or None if the token is
+    malformed, has a bad signature or is expired.
+    """
     try:
-        payload = jwt.decode(
-            token,
-            os.getenv('JWT_SECRET_KEY'),
-            algorithms=['HS256']
-        )
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
+        signing_input, _, signature = token.rpartition('.')
+        header_segment, _, payload_segment = signing_input.partition('.')
+
+        header = orjson.loads(_b64url_decode(header_segment))
+        if not isinstance(header, dict) or header.get('alg') != 'HS256':
+            return None
+
+        expected = hmac.new(
+            _JWT_SECRET_KEY_BYTES,
+            signing_input.encode('ascii'),
+            hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+
+        payload = orjson.loads(_b64url_decode(payload_segment))
+    except ValueError:
+        # Covers bad base64, non-ASCII input and invalid JSON
+        return None
+
+    if not isinstance(payload, dict):
         return None
-    except jwt.InvalidTokenError:
+
+    exp = payload.get('exp')
+    if not isinstance(exp, (int, float)) or exp <= time.time():
         return None
 
+    return payload
+
+def verify_token(token):
+    cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+    user_id = _token_cache.get(cache_key)
+    if user_id is not None:
+        return user_id
+
+    payload = _verify_hs256(token)
+    if payload is None:
+        return None
+
+    user_id = payload.get('user_id')
+    # Never cache a token past its own expiration
+    ttl = min(_token_cache.ttl, payload['exp'] - time.time())
+    if user_id is not None and ttl > 0:
+        _token_cache.set(cache_key, user_id, ttl=ttl)
+    return user_id
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
         token = None
         
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
+        if auth_header:
+            if not auth_header.startswith('Bearer '):
                 return jsonify({'message': 'Invalid token format'}), 401
+            token = auth_header[7:]
         
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
@@ -66,7 +166,7 @@ def token_required(f):
         if user_id is None:
             return jsonify({'message': 'Token is invalid or expired'}), 401
         
-        current_user = User.query.get(user_id)
+        current_user = _load_current_user(user_id)
         
         if not current_user:
             return jsonify({'message': 'User not found'}), 401
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    clear() bumps `generation`; a value computed from data read before the
+    clear is dropped by set() when the caller passes the generation it saw
+    before reading, so it cannot outlive the write that invalidated it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+
+# Serialized responses of read-heavy event views (map data, ...). Entries
+# live a few seconds at most and the whole cache is cleared on event writes.
+# The cache is per process: other workers keep serving their entries until
+# they expire, so views may lag a write by up to their TTL.
+event_views_cache = TTLCache(maxsize=32, ttl=2)
+
+# Aggregate views (statistics, routing options) are costly to compute, so they
+# stay in event_views_cache a little longer.
+AGGREGATE_VIEWS_TTL = 5
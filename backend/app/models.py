@@ -12,10 +12,10 @@ class User(db.Model):
     role = db.Column(db.String(20), default='user')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    events = db.relationship('Event', backref='reporter', lazy=True)
-    notifications = db.relationship('Notification', backref='recipient', lazy=True)
-    favorites = db.relationship('UserFavorite', backref='owner', lazy=True)
-    route_requests = db.relationship('RouteRequest', backref='requester', lazy=True)
+    events = db.relationship('Event', backref='reporter', lazy='raise')
+    notifications = db.relationship('Notification', backref='recipient', lazy='raise')
+    favorites = db.relationship('UserFavorite', backref='owner', lazy='raise')
+    route_requests = db.relationship('RouteRequest', backref='requester', lazy='raise')
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -46,17 +46,29 @@ class Event(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     reported_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
-    type = db.Column(db.String(50), nullable=False)
+    type = db.Column(db.String(50), nullable=False, index=True)
     severity = db.Column(db.Integer, nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='active')
     expires_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     report_meta = db.relationship('EventReport', backref='event', uselist=False, cascade="all, delete-orphan")
 
-    route_links = db.relationship('RouteEventLink', backref='event', lazy=True)
+    route_links = db.relationship('RouteEventLink', backref='event', lazy='raise')
+
+    # Hot queries filter on status plus either type and a lat/lon box (duplicate
+    # check, nearby, route scoring) or severity (statistics).
+    # The event list is ordered (and paginated) by created_at, id within a status.
+    # Types are stored lower-case so they can be compared without lower().
+    __table_args__ = (
+        db.Index('ix_event_status_type_lat_lon', 'status', 'type', 'latitude', 'longitude'),
+        db.Index('ix_event_status_severity', 'status', 'severity'),
+        db.Index('ix_event_status_created_at', 'status', 'created_at', 'id'),
+        db.CheckConstraint('type = lower(type)', name='ck_events_type_lowercase'),
+    )
 
 class EventReport(db.Model):
     __tablename__ = 'events_reports'
@@ -97,7 +109,7 @@ class Route(db.Model):
     polyline = db.Column(db.Text, nullable=False)
     score = db.Column(db.Integer, default=100)
     
-    impacts = db.relationship('RouteEventLink', backref='route', lazy=True)
+    impacts = db.relationship('RouteEventLink', backref='route', lazy='raise')
 
 class RouteEventLink(db.Model):
     __tablename__ = 'route_event_links'
@@ -0,0 +1,53 @@
+"""
+Compiled kernels for route scoring.
+
+numba is an optional dependency: when it is not installed min_distances_km
+is None and routing_routes falls back to its NumPy implementation. With numba
+the kernel is compiled for its float64 signature when this module is imported,
+so no request pays the JIT cost, and it releases the GIL so concurrent
+requests on other worker threads keep running while it scores a route.
+"""
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _min_distances_km(xs, ys, ax, ay, dx, dy, inv_len2):
+    """
+    For each projected point (xs[i], ys[i]) return the minimum distance in km
+    to the segments described by (ax, ay, dx, dy, inv_len2), in one fused
+    loop over points and segments without temporary arrays.
+    """
+    n_points = xs.shape[0]
+    n_segments = ax.shape[0]
+    distances = np.empty(n_points, dtype=np.float64)
+    for i in range(n_points):
+        best = np.inf
+        for j in range(n_segments):
+            px = xs[i] - ax[j]
+            py = ys[i] - ay[j]
+            t = (px * dx[j] + py * dy[j]) * inv_len2[j]
+            if t < 0.0:
+                t = 0.0
+            elif t > 1.0:
+                t = 1.0
+            ex = px - t * dx[j]
+            ey = py - t * dy[j]
+            dist_sq = ex * ex + ey * ey
+            if dist_sq < best:
+                best = dist_sq
+        distances[i] = math.sqrt(best)
+    return distances
+
+
+_SIGNATURE = 'float64[:](float64[:], float64[:], float64[:], float64[:], float64[:], float64[:], float64[:])'
+
+min_distances_km = (
+    njit(_SIGNATURE, nogil=True, cache=True)(_min_distances_km)
+    if njit is not None else None
+)
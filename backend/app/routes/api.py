@@ -1,11 +1,9 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import select
 from ..models import Event, EventReport
 from .. import db
-from ..validators import (
-    validate_coordinates, 
-    validate_event_type, 
-    validate_severity
-)
+from ..cache import event_views_cache
+from ..validators import EVENT_TYPES, VALID_EVENT_TYPES
 from datetime import datetime
 from . import api
 
@@ -21,92 +19,95 @@ def get_map_data():
     2. heatmap: Lista simplă pentru zonele roșii (Heatmap)
     """
     
-    print("📢 Request primit pe /api/map-data")
+    current_app.logger.debug('Request primit pe /api/map-data')
     
     try:        
-        # Luăm doar evenimentele active
-        active_events = Event.query.filter_by(status='active').all()
+        # Luăm doar evenimentele active, doar coloanele necesare (fără obiecte ORM)
+        rows = db.session.execute(
+            select(
+                Event.id, Event.type, Event.severity,
+                Event.latitude, Event.longitude, Event.created_at
+            ).where(Event.status == 'active').order_by(Event.id)
+        ).all()
         
         markers = []
         heatmap_points = []
         
-        for event in active_events:
+        # Un singur pas peste rânduri pentru ambele liste
+        for event_id, event_type, severity, latitude, longitude, created_at in rows:
             # 1. Construim datele pentru Markere (Userul dă click pe ele)
             markers.append({
-                'id': event.id,
-                'type': event.type,       # ex: 'accident', 'police'
-                'severity': event.severity, # 1-5
-                'lat': event.latitude,
-                'lng': event.longitude,
-                'created_at': event.created_at.isoformat(),
-                'description': f"Incident: {event.type} (Severitate: {event.severity})"
+                'id': event_id,
+                'type': event_type,       # ex: 'accident', 'police'
+                'severity': severity, # 1-5
+                'lat': latitude,
+                'lng': longitude,
+                'created_at': created_at,
+                'description': f"Incident: {event_type} (Severitate: {severity})"
             })
 
-            # 2. Construim datele pentru Heatmap
-            # Heatmap-ul are nevoie de locație și 'weight' (intensitate)
+            # 2. Construim datele pentru Heatmap: [lat, lng, weight]
             # Severitatea 5 va fi mult mai 'roșie' decât severitatea 1
-            heatmap_points.append({
-                'lat': event.latitude,
-                'lng': event.longitude,
-                'weight': event.severity 
-            })
+            heatmap_points.append((latitude, longitude, severity))
 
         return jsonify({
             'markers': markers,
             'heatmap': heatmap_points
         }), 200
     except Exception as e:
-        print(f"❌ Eroare server: {e}")
+        current_app.logger.exception('Eroare server la /api/map-data')
         return jsonify({'error': str(e)}), 500
 
 # --- RUTA 2: POST - Raportare Incident Nou (folosind validators.py) ---
 @api.route('/report', methods=['POST'])
 # @token_required  <-- Decommentat cand vrei sa permiti doar userilor logati
 def report_event():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     
     if not data:
         return jsonify({'message': 'No data provided'}), 400
 
     # 1. Validare Tip Eveniment
-    is_valid_type, type_msg = validate_event_type(data.get('type'))
-    if not is_valid_type:
-        return jsonify({'message': type_msg}), 400
+    event_type = data.get('type')
+    if not isinstance(event_type, str) or event_type not in VALID_EVENT_TYPES:
+        return jsonify({'message': f"Invalid event type. Must be one of: {', '.join(EVENT_TYPES)}"}), 400
 
     # 2. Validare Coordonate
-    is_valid_coord, coord_msg = validate_coordinates(data.get('latitude'), data.get('longitude'))
-    if not is_valid_coord:
-        return jsonify({'message': coord_msg}), 400
+    try:
+        latitude = float(data.get('latitude'))
+        longitude = float(data.get('longitude'))
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Invalid coordinate format'}), 400
+    if not -90 <= latitude <= 90:
+        return jsonify({'message': 'Latitude must be between -90 and 90'}), 400
+    if not -180 <= longitude <= 180:
+        return jsonify({'message': 'Longitude must be between -180 and 180'}), 400
 
     # 3. Validare Severitate
-    # Atentie: Functia ta returneaza 3 valori (bool, msg, valoare_convertita)
-    is_valid_sev, sev_msg, valid_severity_int = validate_severity(data.get('severity'))
-    if not is_valid_sev:
-        return jsonify({'message': sev_msg}), 400
+    try:
+        severity = int(data.get('severity'))
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Severity must be a number between 1 and 5'}), 400
+    if not 1 <= severity <= 5:
+        return jsonify({'message': 'Severity must be between 1 and 5'}), 400
 
     try:
-        # Creăm evenimentul
+        # Creăm evenimentul împreună cu intrarea din tabela de rapoarte,
+        # ambele sunt inserate la un singur commit
         new_event = Event(
-            type=data.get('type'),
-            severity=valid_severity_int,
-            latitude=float(data.get('latitude')),
-            longitude=float(data.get('longitude')),
+            type=event_type,
+            severity=severity,
+            latitude=latitude,
+            longitude=longitude,
             status='active',
             # reported_by=current_user.id  <-- Daca folosesti token_required
-            expires_at=None # Sau poti calcula o expirare default (ex: +2 ore)
+            expires_at=None, # Sau poti calcula o expirare default (ex: +2 ore)
+            report_meta=EventReport(reports_count=1)
         )
         
         db.session.add(new_event)
-        db.session.flush() # Pentru a obtine ID-ul
-
-        # Creăm și intrarea în tabela de rapoarte
-        new_report = EventReport(
-            event_id=new_event.id,
-            reports_count=1
-        )
-        db.session.add(new_report)
-        
         db.session.commit()
+        event_views_cache.clear()
         
         return jsonify({
             'message': 'Incident reported successfully',
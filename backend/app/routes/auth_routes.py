@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import or_, select
 from ..models import User
-from ..auth import hash_password, check_password, generate_token, token_required
+from ..auth import hash_password, check_password, password_needs_rehash, generate_token, token_required
 from .. import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -8,9 +9,9 @@ auth_bp = Blueprint('auth', __name__)
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
-        if not data or not data.get('username') or not data.get('email') or not data.get('password'):
+        if not data.get('username') or not data.get('email') or not data.get('password'):
             return jsonify({'message': 'Missing required fields: username, email, password'}), 400
         
         username = data.get('username').strip()
@@ -23,10 +24,16 @@ def register():
         if len(password) < 6:
             return jsonify({'message': 'Password must be at least 6 characters'}), 400
         
-        if User.query.filter_by(username=username).first():
+        taken = db.session.execute(
+            select(User.username, User.email)
+            .where(or_(User.username == username, User.email == email))
+            .limit(2)
+        ).all()
+        
+        if any(row.username == username for row in taken):
             return jsonify({'message': 'Username already exists'}), 409
         
-        if User.query.filter_by(email=email).first():
+        if any(row.email == email for row in taken):
             return jsonify({'message': 'Email already exists'}), 409
         
         hashed_password = hash_password(password)
@@ -60,9 +67,9 @@ def register():
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
-        if not data or not data.get('email') or not data.get('password'):
+        if not data.get('email') or not data.get('password'):
             return jsonify({'message': 'Missing required fields: email, password'}), 400
         
         email = data.get('email').strip().lower()
@@ -76,6 +83,11 @@ def login():
         if not check_password(user.password_hash, password):
             return jsonify({'message': 'Invalid email or password'}), 401
         
+        # Upgrade legacy bcrypt (or outdated Argon2) hashes while we have the password
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.session.commit()
+        
         token = generate_token(user.id)
         
         return jsonify({
@@ -101,7 +113,7 @@ def get_current_user(current_user):
             'username': current_user.username,
             'email': current_user.email,
             'role': current_user.role,
-            'created_at': current_user.created_at.isoformat()
+            'created_at': current_user.created_at
         }
     }), 200
 
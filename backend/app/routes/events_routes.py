@@ -1,52 +1,106 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime, timedelta
-from ..models import Event, EventReport, User
+from flask import Blueprint, current_app, jsonify, request
+from datetime import datetime, timedelta, timezone
+import math
+from operator import attrgetter
+from sqlalchemy import case, func, select, tuple_, update
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from ..models import Event, EventReport
 from ..auth import token_required
+from ..cache import AGGREGATE_VIEWS_TTL, event_views_cache
+from ..validators import EVENT_TYPES, VALID_SEVERITIES, validate_event_payload
 from .. import db
 
 events_bp = Blueprint('events', __name__)
 
+EARTH_RADIUS_KM = 6371.0
+
+# Coloanele serializate pentru un eveniment, citite dintr-un singur attrgetter
+_EVENT_KEYS = ('id', 'type', 'severity', 'latitude', 'longitude', 'status', 'expires_at', 'created_at')
+_EVENT_LIST_KEYS = _EVENT_KEYS + ('reported_by',)
+_event_values = attrgetter(*_EVENT_KEYS)
+_event_list_values = attrgetter(*_EVENT_LIST_KEYS)
+
+def _reports_count(event):
+    return event.report_meta.reports_count if event.report_meta else 1
+
 # --- RUTA NOUĂ PENTRU HARTĂ (Map Data) ---
+def _map_data_etag():
+    """
+    Amprenta setului de evenimente active: se schimba la orice insert,
+    delete sau update al unui eveniment activ.
+    """
+    active_count, max_id, last_update = db.session.execute(
+        select(func.count(Event.id), func.max(Event.id), func.max(Event.updated_at))
+        .where(Event.status == 'active')
+    ).one()
+    return f"{active_count}-{max_id or 0}-{int(last_update.timestamp() * 1e6) if last_update else 0}"
+
+def _map_data_body():
+    # Luăm doar evenimentele active, doar coloanele necesare (fără obiecte ORM)
+    rows = db.session.execute(
+        select(
+            Event.id, Event.type, Event.severity,
+            Event.latitude, Event.longitude, Event.created_at
+        ).where(Event.status == 'active').order_by(Event.id)
+    ).all()
+    
+    markers = []
+    heatmap_points = []
+    
+    # Un singur pas peste rânduri pentru ambele liste
+    for event_id, event_type, severity, latitude, longitude, created_at in rows:
+        # 1. Date pentru Markere (Userul dă click pe ele)
+        # Mapam 'latitude' -> 'lat' și 'longitude' -> 'lng' pentru frontend
+        markers.append({
+            'id': event_id,
+            'type': event_type,
+            'severity': severity,
+            'lat': latitude,
+            'lng': longitude,
+            'created_at': created_at,
+            'description': f"{event_type.capitalize()} - Severitate: {severity}"
+        })
+
+        # 2. Date pentru Heatmap: [lat, lng, weight]
+        # (ArcGIS folosește severitatea ca intensitate)
+        heatmap_points.append((latitude, longitude, severity))
+
+    return jsonify({
+        'markers': markers,
+        'heatmap': heatmap_points
+    }).get_data()
+
 @events_bp.route('/map-data', methods=['GET'])
 def get_map_data():
     """
     Returnează datele optimizate pentru harta din Frontend (ArcGIS).
     Separă datele în markere și puncte pentru heatmap.
+    Răspunsul serializat e ținut în cache câteva secunde, iar clienții care
+    au deja versiunea curentă (If-None-Match) primesc 304.
     """
     try:
-        # Luăm doar evenimentele active
-        active_events = Event.query.filter_by(status='active').all()
+        generation = event_views_cache.generation
+        cached = event_views_cache.get('map-data')
+        if cached is not None:
+            etag, body = cached
+        else:
+            etag, body = _map_data_etag(), None
         
-        markers = []
-        heatmap_points = []
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            if body is None:
+                body = _map_data_body()
+                event_views_cache.set('map-data', (etag, body), generation=generation)
+            response = current_app.response_class(body, mimetype='application/json')
         
-        for event in active_events:
-            # 1. Date pentru Markere (Userul dă click pe ele)
-            # Mapam 'latitude' -> 'lat' și 'longitude' -> 'lng' pentru frontend
-            markers.append({
-                'id': event.id,
-                'type': event.type,
-                'severity': event.severity,
-                'lat': event.latitude,
-                'lng': event.longitude,
-                'created_at': event.created_at.isoformat(),
-                'description': f"{event.type.capitalize()} - Severitate: {event.severity}"
-            })
-
-            # 2. Date pentru Heatmap (ArcGIS folosește severitatea ca intensitate)
-            heatmap_points.append({
-                'lat': event.latitude,
-                'lng': event.longitude,
-                'weight': event.severity 
-            })
-
-        return jsonify({
-            'markers': markers,
-            'heatmap': heatmap_points
-        }), 200
+        response.set_etag(etag, weak=True)
+        # Clientii revalideaza mereu, dar primesc 304 cat timp datele nu s-au schimbat
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
     except Exception as e:
-        print(f"❌ Eroare la map-data: {e}")
+        current_app.logger.exception('Eroare la map-data')
         return jsonify({'message': f'Error fetching map data: {str(e)}'}), 500
 
 # --- RUTELE EXISTENTE ---
@@ -58,8 +112,13 @@ def get_all_events():
         severity = request.args.get('severity')
         status = request.args.get('status', 'active')
         limit = request.args.get('limit', 100, type=int)
+        before = request.args.get('before')
+        before_id = request.args.get('before_id', type=int)
         
-        query = Event.query
+        # report_meta e citit pentru fiecare eveniment - il incarcam dintr-un singur query.
+        # raiseload('*') face ca orice alta relatie accesata din greseala sa arunce
+        # eroare in loc sa genereze cate un SELECT per eveniment (N+1)
+        query = Event.query.options(selectinload(Event.report_meta), raiseload('*'))
         
         if event_type:
             query = query.filter_by(type=event_type)
@@ -70,27 +129,35 @@ def get_all_events():
         if status:
             query = query.filter_by(status=status)
         
-        events = query.order_by(Event.created_at.desc()).limit(limit).all()
-        
-        events_data = []
-        for event in events:
-            event_dict = {
-                'id': event.id,
-                'type': event.type,
-                'severity': event.severity,
-                'latitude': event.latitude,
-                'longitude': event.longitude,
-                'status': event.status,
-                'expires_at': event.expires_at.isoformat() if event.expires_at else None,
-                'created_at': event.created_at.isoformat(),
-                'reported_by': event.reported_by,
-                'reports_count': event.report_meta.reports_count if event.report_meta else 1
-            }
-            events_data.append(event_dict)
+        # Paginare keyset: pagina următoare începe după (created_at, id) al
+        # ultimului eveniment primit, fără OFFSET
+        if before:
+            try:
+                before = datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({'message': 'Invalid before cursor'}), 400
+            if before.tzinfo is not None:
+                before = before.astimezone(timezone.utc).replace(tzinfo=None)
+            if before_id is not None:
+                query = query.filter(tuple_(Event.created_at, Event.id) < (before, before_id))
+            else:
+                query = query.filter(Event.created_at < before)
+        
+        events = query.order_by(Event.created_at.desc(), Event.id.desc()).limit(limit).all()
+        
+        events_data = [
+            dict(zip(_EVENT_LIST_KEYS, _event_list_values(event)), reports_count=_reports_count(event))
+            for event in events
+        ]
+        
+        next_cursor = None
+        if events and len(events) == limit:
+            next_cursor = {'before': events[-1].created_at, 'before_id': events[-1].id}
         
         return jsonify({
             'events': events_data,
-            'count': len(events_data)
+            'count': len(events_data),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -99,33 +166,27 @@ def get_all_events():
 @events_bp.route('/<int:event_id>', methods=['GET'])
 def get_event(event_id):
     try:
-        event = Event.query.get(event_id)
+        event = db.session.get(
+            Event,
+            event_id,
+            options=[joinedload(Event.reporter), joinedload(Event.report_meta), raiseload('*')]
+        )
         
         if not event:
             return jsonify({'message': 'Event not found'}), 404
         
         reporter = None
-        if event.reported_by:
-            user = User.query.get(event.reported_by)
-            if user:
-                reporter = {
-                    'id': user.id,
-                    'username': user.username
-                }
+        if event.reporter:
+            reporter = {
+                'id': event.reporter.id,
+                'username': event.reporter.username
+            }
         
-        event_data = {
-            'id': event.id,
-            'type': event.type,
-            'severity': event.severity,
-            'latitude': event.latitude,
-            'longitude': event.longitude,
-            'status': event.status,
-            'expires_at': event.expires_at.isoformat() if event.expires_at else None,
-            'created_at': event.created_at.isoformat(),
-            'reported_by': event.reported_by,
-            'reporter': reporter,
-            'reports_count': event.report_meta.reports_count if event.report_meta else 1
-        }
+        event_data = dict(
+            zip(_EVENT_LIST_KEYS, _event_list_values(event)),
+            reporter=reporter,
+            reports_count=_reports_count(event)
+        )
         
         return jsonify({'event': event_data}), 200
         
@@ -136,62 +197,52 @@ def get_event(event_id):
 @token_required
 def create_event(current_user):
     try:
-        data = request.get_json()
-        
-        required_fields = ['type', 'severity', 'latitude', 'longitude']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'message': f'Missing required field: {field}'}), 400
-        
-        valid_types = ['accident', 'construction', 'traffic_jam', 'road_closure', 'hazard', 'police', 'other']
-        if data['type'] not in valid_types:
-            return jsonify({'message': f'Invalid event type. Must be one of: {", ".join(valid_types)}'}), 400
-        
-        try:
-            severity = int(data['severity'])
-            if severity < 1 or severity > 5:
-                return jsonify({'message': 'Severity must be between 1 and 5'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'message': 'Severity must be a number between 1 and 5'}), 400
-        
-        try:
-            latitude = float(data['latitude'])
-            longitude = float(data['longitude'])
-            
-            if latitude < -90 or latitude > 90:
-                return jsonify({'message': 'Latitude must be between -90 and 90'}), 400
-            
-            if longitude < -180 or longitude > 180:
-                return jsonify({'message': 'Longitude must be between -180 and 180'}), 400
-                
-        except (ValueError, TypeError):
-            return jsonify({'message': 'Invalid coordinates format'}), 400
+        data = request.get_json(silent=True) or {}
+        
+        valid, message, fields = validate_event_payload(data)
+        if not valid:
+            return jsonify({'message': message}), 400
+        latitude, longitude = fields['latitude'], fields['longitude']
         
         tolerance = 0.001
-        existing_event = Event.query.filter(
-            Event.latitude.between(latitude - tolerance, latitude + tolerance),
-            Event.longitude.between(longitude - tolerance, longitude + tolerance),
-            Event.type == data['type'],
-            Event.status == 'active'
+        # Evenimentul duplicat și rândul lui din events_reports, într-o singură interogare
+        duplicate = db.session.execute(
+            select(Event.id, Event.type, Event.severity, Event.latitude, Event.longitude,
+                   EventReport.id.label('report_id'))
+            .outerjoin(EventReport, EventReport.event_id == Event.id)
+            .where(
+                Event.latitude.between(latitude - tolerance, latitude + tolerance),
+                Event.longitude.between(longitude - tolerance, longitude + tolerance),
+                Event.type == fields['type'],
+                Event.status == 'active'
+            )
+            .limit(1)
         ).first()
         
-        if existing_event:
-            if not existing_event.report_meta:
-                report_meta = EventReport(event_id=existing_event.id, reports_count=1)
-                db.session.add(report_meta)
-            
-            existing_event.report_meta.reports_count += 1
+        if duplicate is not None:
+            if duplicate.report_id is not None:
+                # Incrementăm atomic contorul, fără citire prealabilă
+                reports_count = db.session.execute(
+                    update(EventReport)
+                    .where(EventReport.id == duplicate.report_id)
+                    .values(reports_count=EventReport.reports_count + 1)
+                    .returning(EventReport.reports_count)
+                ).scalar_one()
+            else:
+                # Duplicat fără rând în events_reports: îl creăm (raportul inițial + cel curent)
+                reports_count = 2
+                db.session.add(EventReport(event_id=duplicate.id, reports_count=reports_count))
             db.session.commit()
             
             return jsonify({
                 'message': 'Event already exists. Report count increased.',
                 'event': {
-                    'id': existing_event.id,
-                    'type': existing_event.type,
-                    'severity': existing_event.severity,
-                    'latitude': existing_event.latitude,
-                    'longitude': existing_event.longitude,
-                    'reports_count': existing_event.report_meta.reports_count
+                    'id': duplicate.id,
+                    'type': duplicate.type,
+                    'severity': duplicate.severity,
+                    'latitude': duplicate.latitude,
+                    'longitude': duplicate.longitude,
+                    'reports_count': reports_count
                 }
             }), 200
         
@@ -199,24 +250,18 @@ def create_event(current_user):
         
         new_event = Event(
             reported_by=current_user.id,
-            type=data['type'],
-            severity=severity,
+            type=fields['type'],
+            severity=fields['severity'],
             latitude=latitude,
             longitude=longitude,
             status='active',
-            expires_at=expires_at
+            expires_at=expires_at,
+            report_meta=EventReport(reports_count=1)
         )
         
         db.session.add(new_event)
-        db.session.flush()
-        
-        report_meta = EventReport(
-            event_id=new_event.id,
-            reports_count=1
-        )
-        db.session.add(report_meta)
-        
         db.session.commit()
+        event_views_cache.clear()
         
         return jsonify({
             'message': 'Event created successfully',
@@ -227,8 +272,8 @@ def create_event(current_user):
                 'latitude': new_event.latitude,
                 'longitude': new_event.longitude,
                 'status': new_event.status,
-                'expires_at': new_event.expires_at.isoformat(),
-                'created_at': new_event.created_at.isoformat(),
+                'expires_at': new_event.expires_at,
+                'created_at': new_event.created_at,
                 'reported_by': new_event.reported_by
             }
         }), 201
@@ -249,48 +294,16 @@ def update_event(current_user, event_id):
         if event.reported_by != current_user.id and current_user.role != 'admin':
             return jsonify({'message': 'Unauthorized to update this event'}), 403
         
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
-        if 'type' in data:
-            valid_types = ['accident', 'construction', 'traffic_jam', 'road_closure', 'hazard', 'police', 'other']
-            if data['type'] not in valid_types:
-                return jsonify({'message': f'Invalid event type. Must be one of: {", ".join(valid_types)}'}), 400
-            event.type = data['type']
-        
-        if 'severity' in data:
-            try:
-                severity = int(data['severity'])
-                if severity < 1 or severity > 5:
-                    return jsonify({'message': 'Severity must be between 1 and 5'}), 400
-                event.severity = severity
-            except (ValueError, TypeError):
-                return jsonify({'message': 'Severity must be a number'}), 400
-        
-        if 'status' in data:
-            valid_statuses = ['active', 'resolved', 'expired']
-            if data['status'] not in valid_statuses:
-                return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
-            event.status = data['status']
-        
-        if 'latitude' in data:
-            try:
-                latitude = float(data['latitude'])
-                if latitude < -90 or latitude > 90:
-                    return jsonify({'message': 'Latitude must be between -90 and 90'}), 400
-                event.latitude = latitude
-            except (ValueError, TypeError):
-                return jsonify({'message': 'Invalid latitude format'}), 400
-        
-        if 'longitude' in data:
-            try:
-                longitude = float(data['longitude'])
-                if longitude < -180 or longitude > 180:
-                    return jsonify({'message': 'Longitude must be between -180 and 180'}), 400
-                event.longitude = longitude
-            except (ValueError, TypeError):
-                return jsonify({'message': 'Invalid longitude format'}), 400
+        valid, message, fields = validate_event_payload(data, partial=True)
+        if not valid:
+            return jsonify({'message': message}), 400
+        for field, value in fields.items():
+            setattr(event, field, value)
         
         db.session.commit()
+        event_views_cache.clear()
         
         return jsonify({
             'message': 'Event updated successfully',
@@ -301,8 +314,8 @@ def update_event(current_user, event_id):
                 'latitude': event.latitude,
                 'longitude': event.longitude,
                 'status': event.status,
-                'expires_at': event.expires_at.isoformat() if event.expires_at else None,
-                'created_at': event.created_at.isoformat()
+                'expires_at': event.expires_at,
+                'created_at': event.created_at
             }
         }), 200
         
@@ -324,6 +337,7 @@ def delete_event(current_user, event_id):
         
         db.session.delete(event)
         db.session.commit()
+        event_views_cache.clear()
         
         return jsonify({'message': 'Event deleted successfully'}), 200
         
@@ -359,22 +373,35 @@ def report_event(current_user, event_id):
 
 @events_bp.route('/statistics', methods=['GET'])
 def get_statistics():
+    generation = event_views_cache.generation
+    cached = event_views_cache.get('statistics')
+    if cached is not None:
+        return jsonify(cached), 200
+    
     try:
-        total_events = Event.query.count()
-        active_events = Event.query.filter_by(status='active').count()
-        resolved_events = Event.query.filter_by(status='resolved').count()
-        
-        types_count = {}
-        for event_type in ['accident', 'construction', 'traffic_jam', 'road_closure', 'hazard', 'police', 'other']:
-            count = Event.query.filter_by(type=event_type, status='active').count()
-            types_count[event_type] = count
-        
-        severity_count = {}
-        for severity in range(1, 6):
-            count = Event.query.filter_by(severity=severity, status='active').count()
-            severity_count[str(severity)] = count
-        
-        return jsonify({
+        total_events, active_events, resolved_events = db.session.execute(
+            select(
+                func.count(Event.id),
+                func.count(case((Event.status == 'active', 1))),
+                func.count(case((Event.status == 'resolved', 1)))
+            )
+        ).one()
+        
+        active_by_type = dict(db.session.execute(
+            select(Event.type, func.count(Event.id))
+            .where(Event.status == 'active')
+            .group_by(Event.type)
+        ).all())
+        types_count = {event_type: active_by_type.get(event_type, 0) for event_type in EVENT_TYPES}
+        
+        active_by_severity = dict(db.session.execute(
+            select(Event.severity, func.count(Event.id))
+            .where(Event.status == 'active')
+            .group_by(Event.severity)
+        ).all())
+        severity_count = {str(severity): active_by_severity.get(severity, 0) for severity in VALID_SEVERITIES}
+        
+        payload = {
             'statistics': {
                 'total_events': total_events,
                 'active_events': active_events,
@@ -382,11 +409,23 @@ def get_statistics():
                 'by_type': types_count,
                 'by_severity': severity_count
             }
-        }), 200
+        }
+        event_views_cache.set('statistics', payload, ttl=AGGREGATE_VIEWS_TTL, generation=generation)
+        return jsonify(payload), 200
         
     except Exception as e:
         return jsonify({'message': f'Error fetching statistics: {str(e)}'}), 500
 
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distanța pe sferă (km) dintre două puncte.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
 @events_bp.route('/nearby', methods=['GET'])
 def get_nearby_events():
     try:
@@ -397,29 +436,23 @@ def get_nearby_events():
         if latitude is None or longitude is None:
             return jsonify({'message': 'Missing latitude or longitude'}), 400
         
+        # Bounding box pentru filtrul din baza de date; un grad de longitudine
+        # se micșorează cu cos(latitudine)
         lat_delta = radius / 111.0
-        lon_delta = radius / (111.0 * abs(float(latitude)))
+        lon_delta = radius / (111.0 * max(math.cos(math.radians(latitude)), 1e-6))
         
-        events = Event.query.filter(
+        events = Event.query.options(selectinload(Event.report_meta), raiseload('*')).filter(
             Event.latitude.between(latitude - lat_delta, latitude + lat_delta),
             Event.longitude.between(longitude - lon_delta, longitude + lon_delta),
             Event.status == 'active'
-        ).all()
-        
-        events_data = []
-        for event in events:
-            event_dict = {
-                'id': event.id,
-                'type': event.type,
-                'severity': event.severity,
-                'latitude': event.latitude,
-                'longitude': event.longitude,
-                'status': event.status,
-                'expires_at': event.expires_at.isoformat() if event.expires_at else None,
-                'created_at': event.created_at.isoformat(),
-                'reports_count': event.report_meta.reports_count if event.report_meta else 1
-            }
-            events_data.append(event_dict)
+        ).order_by(Event.id).all()
+        
+        # Colțurile bounding box-ului sunt în afara razei
+        events_data = [
+            dict(zip(_EVENT_KEYS, _event_values(event)), reports_count=_reports_count(event))
+            for event in events
+            if _haversine_km(latitude, longitude, event.latitude, event.longitude) <= radius
+        ]
         
         return jsonify({
             'events': events_data,
@@ -1,15 +1,20 @@
-import json
 import math
-from typing import Iterable, List, Optional, Tuple
+import numpy as np
+import orjson
+from typing import FrozenSet, List, Optional, Tuple
 from flask import Blueprint, jsonify, request
+from sqlalchemy import and_, insert, or_, select
 from ..auth import token_required
+from ..cache import AGGREGATE_VIEWS_TTL, event_views_cache
 from ..models import Event, Route, RouteEventLink, RouteRequest
 from ..validators import validate_coordinates
+from ._routing_kernels import min_distances_km as _min_distances_kernel
 from .. import db
 
 routing_bp = Blueprint('routing', __name__)
 
-TRAVEL_MODES = {'car', 'bicycle', 'pedestrian'}
+TRAVEL_MODES = frozenset({'car', 'bicycle', 'pedestrian'})
+TRAVEL_MODES_SORTED = tuple(sorted(TRAVEL_MODES))
 
 # Scoring configuration - more reasonable for urban environments
 CRITICAL_DISTANCE_KM = 0.05   # 50 meters - very dangerous, on the route
@@ -17,56 +22,144 @@ DANGER_DISTANCE_KM = 0.2      # 200 meters - dangerous proximity
 WARNING_DISTANCE_KM = 0.5     # 500 meters - worth noting but not critical
 MAX_REPORT_DISTANCE_KM = 1.0  # 1 km - max distance to report in impacts
 
+KM_PER_DEG_LAT = 111.0
+# Upper bound on (point, segment) pairs per chunk of the NumPy distance fallback
+DISTANCE_CHUNK_PAIRS = 1 << 15
 
-def _project_to_planar(lat: float, lon: float, ref_lat: float) -> Tuple[float, float]:
+
+def _parse_paths(raw_paths) -> Optional[List[np.ndarray]]:
     """
-    Convert geographic coords to a local planar approximation in kilometers.
+    Convert polyline paths ([[lon, lat], ...]) into contiguous (N, 2) float64
+    arrays, once per request. A vertex with fewer than two coordinates splits
+    its path, since no segment can use it. Returns None if the payload is
+    malformed or a coordinate is not a finite number (null, booleans and
+    numeric strings are rejected rather than coerced).
     """
-    km_per_deg_lat = 111.0
-    km_per_deg_lon = 111.0 * math.cos(math.radians(ref_lat))
-    return lon * km_per_deg_lon, lat * km_per_deg_lat
+    if not isinstance(raw_paths, list):
+        return None
+    runs = []
+    for path in raw_paths:
+        if not isinstance(path, list):
+            return None
+        run = []
+        for point in path:
+            if not isinstance(point, list):
+                return None
+            if len(point) < 2:
+                if run:
+                    runs.append(run)
+                run = []
+                continue
+            coords = point[:2]
+            if any(isinstance(c, bool) or not isinstance(c, (int, float)) for c in coords):
+                return None
+            run.append(coords)
+        if run:
+            runs.append(run)
+    try:
+        arrays = [np.array(run, dtype=np.float64) for run in runs]
+    except OverflowError:
+        return None
+    if not all(np.isfinite(arr).all() for arr in arrays):
+        return None
+    return arrays
 
 
-def _point_to_segment_distance_km(
-    point: Tuple[float, float], segment_start: Tuple[float, float], segment_end: Tuple[float, float]
-) -> float:
-    ref_lat = (point[1] + segment_start[1] + segment_end[1]) / 3.0
-    px, py = _project_to_planar(point[1], point[0], ref_lat)
-    ax, ay = _project_to_planar(segment_start[1], segment_start[0], ref_lat)
-    bx, by = _project_to_planar(segment_end[1], segment_end[0], ref_lat)
+def _path_segments(path: np.ndarray, km_per_deg_lon: float) -> Optional[Tuple[np.ndarray, ...]]:
+    """
+    Project a path ((N, 2) array of [lon, lat]) to planar km coordinates and
+    precompute the event-independent geometry of its segments: arrays (ax, ay,
+    dx, dy, inv_len2) with start point, direction and 1 / squared length (0 for
+    zero-length segments). Returns None for paths without segments.
+    """
+    if len(path) < 2:
+        return None
+    projected = path * np.array([km_per_deg_lon, KM_PER_DEG_LAT])
+    a = projected[:-1]
+    d = projected[1:] - a
+    len2 = (d * d).sum(axis=1)
+    inv_len2 = np.divide(1.0, len2, out=np.zeros_like(len2), where=len2 > 0)
+    return a[:, 0], a[:, 1], d[:, 0], d[:, 1], inv_len2
 
-    dx, dy = bx - ax, by - ay
-    if dx == 0 and dy == 0:
-        return math.hypot(px - ax, py - ay)
 
-    t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
-    t = max(0.0, min(1.0, t))
-    cx, cy = ax + t * dx, ay + t * dy
-    return math.hypot(px - cx, py - cy)
+def _route_segments(paths: List[np.ndarray], km_per_deg_lon: float) -> Optional[Tuple[np.ndarray, ...]]:
+    """
+    Concatenate the _path_segments arrays of every path of a route, or
+    return None when no path has a usable segment.
+    """
+    per_path = [segments for segments in (_path_segments(path, km_per_deg_lon) for path in paths) if segments is not None]
+    if not per_path:
+        return None
+    return tuple(np.concatenate(parts) for parts in zip(*per_path))
 
 
-def _min_distance_to_path_km(path: List[List[float]], lat: float, lon: float) -> Optional[float]:
+def _min_distances_km(segments: Tuple[np.ndarray, ...], xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
     """
-    Return the minimum distance in km from a point to any segment of a path.
-    Path format expected: [[lon, lat], [lon, lat], ...]
+    Return, for each projected point (xs[i], ys[i]), the minimum distance in km
+    to any of the segments. Uses the compiled kernel when numba is installed,
+    otherwise (points x segments) NumPy broadcasts over chunks of points.
     """
-    if len(path) < 2:
-        return None
-    min_dist = None
-    for idx in range(len(path) - 1):
-        start = path[idx]
-        end = path[idx + 1]
-        if len(start) < 2 or len(end) < 2:
-            continue
-        dist = _point_to_segment_distance_km((lon, lat), (start[0], start[1]), (end[0], end[1]))
-        if min_dist is None or dist < min_dist:
-            min_dist = dist
-    return min_dist
-
-
-def _calculate_impact_score(distance_km: float, severity: int, is_avoided_type: bool) -> int:
+    if _min_distances_kernel is not None:
+        return _min_distances_kernel(xs, ys, *segments)
+
+    ax, ay, dx, dy, inv_len2 = segments
+    n_points, n_segments = len(xs), len(ax)
+    distances = np.empty(n_points, dtype=np.float64)
+    if n_points == 0:
+        return distances
+
+    # Points are processed in chunks so the temporaries stay small; the
+    # scratch buffers are allocated once and every step writes into them.
+    chunk = max(1, min(n_points, DISTANCE_CHUNK_PAIRS // n_segments))
+    px, py, t, tmp = (np.empty((chunk, n_segments), dtype=np.float64) for _ in range(4))
+    for start in range(0, n_points, chunk):
+        stop = min(start + chunk, n_points)
+        rows = stop - start
+        cpx, cpy, ct, ctmp = px[:rows], py[:rows], t[:rows], tmp[:rows]
+        np.subtract(xs[start:stop, None], ax, out=cpx)
+        np.subtract(ys[start:stop, None], ay, out=cpy)
+        # Zero-length segments have inv_len2 = 0, i.e. t = 0 (their start point)
+        np.multiply(cpx, dx, out=ct)
+        np.multiply(cpy, dy, out=ctmp)
+        ct += ctmp
+        ct *= inv_len2
+        np.clip(ct, 0.0, 1.0, out=ct)
+        # Offsets from the closest point of each segment, in place
+        np.multiply(ct, dx, out=ctmp)
+        cpx -= ctmp
+        np.multiply(ct, dy, out=ctmp)
+        cpy -= ctmp
+        # Compare squared distances; take the square root once per point
+        cpx *= cpx
+        cpy *= cpy
+        cpx += cpy
+        cpx.min(axis=1, out=distances[start:stop])
+    return np.sqrt(distances, out=distances)
+
+
+def _path_bounding_box(path: np.ndarray, margin_km: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) covering every vertex of a
+    path ((N, 2) array of [lon, lat]), expanded by margin_km on each side.
     """
-    Calculate impact score based on distance, severity, and whether user wanted to avoid this type.
+    min_lon, min_lat = path.min(axis=0).tolist()
+    max_lon, max_lat = path.max(axis=0).tolist()
+    lat_margin = margin_km / KM_PER_DEG_LAT
+    # A degree of longitude is shortest at the latitude farthest from the equator
+    widest_lat = min(90.0, max(abs(min_lat), abs(max_lat)) + lat_margin)
+    lon_margin = margin_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(widest_lat)), 1e-6))
+    return (
+        min_lat - lat_margin,
+        max_lat + lat_margin,
+        min_lon - lon_margin,
+        max_lon + lon_margin,
+    )
+
+
+def _calculate_impact_scores(distances_km: np.ndarray, severities: np.ndarray, is_avoided_type: np.ndarray) -> np.ndarray:
+    """
+    Calculate impact scores based on distance, severity, and whether user wanted to avoid this type.
+    Works element-wise on arrays of impacted events.
     
     Scoring logic:
     - Critical zone (<50m): High impact (15-30 points depending on severity)
@@ -77,40 +170,44 @@ def _calculate_impact_score(distance_km: float, severity: int, is_avoided_type:
     Multiplied by 1.5x if user specifically chose to avoid this incident type.
     """
     # Base severity multiplier (severity 1-5 maps to 0.6-1.4)
-    severity_mult = 0.4 + (severity * 0.2)
+    severity_mult = 0.4 + (severities * 0.2)
     
     # Distance-based impact
-    if distance_km <= CRITICAL_DISTANCE_KM:
-        # Very close - this is essentially on the route
-        base_impact = 20
-    elif distance_km <= DANGER_DISTANCE_KM:
-        # Danger zone - exponential decay from 15 to 5
-        ratio = (distance_km - CRITICAL_DISTANCE_KM) / (DANGER_DISTANCE_KM - CRITICAL_DISTANCE_KM)
-        base_impact = 15 - (ratio * 10)
-    elif distance_km <= WARNING_DISTANCE_KM:
-        # Warning zone - linear decay from 5 to 1
-        ratio = (distance_km - DANGER_DISTANCE_KM) / (WARNING_DISTANCE_KM - DANGER_DISTANCE_KM)
-        base_impact = 5 - (ratio * 4)
-    else:
+    base_impact = np.select(
+        [
+            # Very close - this is essentially on the route
+            distances_km <= CRITICAL_DISTANCE_KM,
+            # Danger zone - exponential decay from 15 to 5
+            distances_km <= DANGER_DISTANCE_KM,
+            # Warning zone - linear decay from 5 to 1
+            distances_km <= WARNING_DISTANCE_KM,
+        ],
+        [
+            20.0,
+            15 - ((distances_km - CRITICAL_DISTANCE_KM) / (DANGER_DISTANCE_KM - CRITICAL_DISTANCE_KM) * 10),
+            5 - ((distances_km - DANGER_DISTANCE_KM) / (WARNING_DISTANCE_KM - DANGER_DISTANCE_KM) * 4),
+        ],
         # Far away - minimal impact
-        ratio = min(1.0, (distance_km - WARNING_DISTANCE_KM) / (MAX_REPORT_DISTANCE_KM - WARNING_DISTANCE_KM))
-        base_impact = 1 - (ratio * 1)
+        default=1 - (np.minimum(1.0, (distances_km - WARNING_DISTANCE_KM) / (MAX_REPORT_DISTANCE_KM - WARNING_DISTANCE_KM)) * 1)
+    )
     
     # Apply severity multiplier
     impact = base_impact * severity_mult
     
     # If user specifically wanted to avoid this type, it's more impactful
-    if is_avoided_type:
-        impact *= 1.5
+    impact = np.where(is_avoided_type, impact * 1.5, impact)
     
-    return max(0, int(round(impact)))
+    # np.rint rounds half to even, like round()
+    return np.maximum(np.rint(impact), 0).astype(np.int64)
 
 
-def _score_route(paths: Iterable[List[List[float]]], avoid_types: List[str]) -> Tuple[int, list]:
+def _score_route(paths: List[np.ndarray], avoid_types: FrozenSet[str]) -> Tuple[int, list]:
     """
-    Compute a safety score (0-100) based on active incidents near the provided paths.
+    Compute a safety score (0-100) based on active incidents near the provided paths
+    (as returned by _parse_paths).
+    avoid_types holds the lower-cased event types the user wants to avoid.
     Returns (score, impacted_events) where impacted_events is a list of
-    (Event, impact_score, distance_km).
+    (event_row, impact_score, distance_km); event_row exposes id, type and severity.
     
     Scoring philosophy:
     - Start with 100 points
@@ -122,31 +219,52 @@ def _score_route(paths: Iterable[List[List[float]]], avoid_types: List[str]) ->
     - A score of 0-30 means very dangerous route
     - A score of 70+ is considered safe
     """
-    avoid_types_lower = {t.lower() for t in avoid_types}
-    active_events = Event.query.filter_by(status='active').all()
-    impacts = []
-    total_impact = 0.0
-
-    for event in active_events:
-        min_distance = None
-        
-        # Find minimum distance to any path segment
-        for path in paths:
-            distance_km = _min_distance_to_path_km(path, event.latitude, event.longitude)
-            if distance_km is not None:
-                if min_distance is None or distance_km < min_distance:
-                    min_distance = distance_km
-        
-        # Skip if too far away
-        if min_distance is None or min_distance > MAX_REPORT_DISTANCE_KM:
-            continue
-        
-        is_avoided_type = event.type.lower() in avoid_types_lower
-        impact_score = _calculate_impact_score(min_distance, event.severity, is_avoided_type)
-        
-        if impact_score > 0:
-            impacts.append((event, impact_score, min_distance))
-            total_impact += impact_score
+    # Only events inside some path's bounding box (padded by the report distance)
+    # can end up in the impacts, so let the database discard the rest. Boxes are
+    # per path so events between far-apart alternative paths are pruned too.
+    path_boxes = [_path_bounding_box(path, MAX_REPORT_DISTANCE_KM) for path in paths]
+    if not path_boxes:
+        return 100, []
+    active_events = db.session.execute(
+        select(Event.id, Event.type, Event.severity, Event.latitude, Event.longitude).where(
+            Event.status == 'active',
+            or_(*(
+                and_(Event.latitude.between(min_lat, max_lat), Event.longitude.between(min_lon, max_lon))
+                for min_lat, max_lat, min_lon, max_lon in path_boxes
+            ))
+        )
+    ).all()
+    # Project the paths once with a single reference latitude for the whole
+    # route; events are projected with the same constants below.
+    ref_lat = (min(box[0] for box in path_boxes) + max(box[1] for box in path_boxes)) / 2.0
+    km_per_deg_lon = KM_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+    segments = _route_segments(paths, km_per_deg_lon)
+    if segments is None or not active_events:
+        return 100, []
+
+    # Column arrays (one entry per candidate event) instead of per-row access
+    _, types, severities, lats, lons = zip(*active_events)
+    xs = np.array(lons, dtype=np.float64) * km_per_deg_lon
+    ys = np.array(lats, dtype=np.float64) * KM_PER_DEG_LAT
+
+    # Distances from every candidate event to every segment of the route at once
+    min_distances = _min_distances_km(segments, xs, ys)
+
+    within = np.flatnonzero(min_distances <= MAX_REPORT_DISTANCE_KM)
+    distances = min_distances[within]
+    impact_scores = _calculate_impact_scores(
+        distances,
+        np.array(severities, dtype=np.float64)[within],
+        np.isin(np.array(types), tuple(avoid_types))[within]
+    )
+
+    # Only the impacted rows are handed back to the caller
+    impacts = [
+        (active_events[idx], impact_score, distance_km)
+        for idx, impact_score, distance_km in zip(within.tolist(), impact_scores.tolist(), distances.tolist())
+        if impact_score > 0
+    ]
+    total_impact = float(sum(impact_score for _, impact_score, _ in impacts))
 
     # Calculate final score (cap deductions at 100)
     score = max(0, min(100, int(round(100.0 - total_impact))))
@@ -158,28 +276,32 @@ def _score_route(paths: Iterable[List[List[float]]], avoid_types: List[str]) ->
 
 
 def _validate_coordinate_payload(prefix: str, payload: dict):
-    lat = payload.get('latitude')
-    lon = payload.get('longitude')
-    valid, message = validate_coordinates(lat, lon)
+    valid, message, coords = validate_coordinates(payload.get('latitude'), payload.get('longitude'))
     if not valid:
         return None, None, f"{prefix}: {message}"
-    return float(lat), float(lon), None
+    return coords[0], coords[1], None
 
 
 @routing_bp.route('/options', methods=['GET'])
 def routing_options():
-    event_types = [row[0] for row in db.session.query(Event.type).distinct().all()]
-    return jsonify({
-        'travel_modes': sorted(list(TRAVEL_MODES)),
-        'available_event_types': sorted(event_types),
-        'default_avoid_types': [etype for etype in event_types if etype in ('accident', 'road_closure', 'construction')]
-    }), 200
+    generation = event_views_cache.generation
+    payload = event_views_cache.get('routing-options')
+    if payload is None:
+        event_types = [row[0] for row in db.session.query(Event.type).distinct().all()]
+        payload = {
+            'travel_modes': list(TRAVEL_MODES_SORTED),
+            'available_event_types': sorted(event_types),
+            'default_avoid_types': [etype for etype in event_types if etype in ('accident', 'road_closure', 'construction')]
+        }
+        event_views_cache.set('routing-options', payload, ttl=AGGREGATE_VIEWS_TTL,
+                              generation=generation)
+    return jsonify(payload), 200
 
 
 @routing_bp.route('/', methods=['POST'])
 @token_required
 def plan_route(current_user):
-    payload = request.get_json() or {}
+    payload = request.get_json(silent=True) or {}
 
     start_data = payload.get('start') or {}
     end_data = payload.get('end') or {}
@@ -195,12 +317,24 @@ def plan_route(current_user):
         return jsonify({'message': error}), 400
 
     if mode not in TRAVEL_MODES:
-        return jsonify({'message': f"Invalid mode '{mode}'. Must be one of {', '.join(sorted(TRAVEL_MODES))}"}), 400
+        return jsonify({'message': f"Invalid mode '{mode}'. Must be one of {', '.join(TRAVEL_MODES_SORTED)}"}), 400
 
     if not isinstance(avoid_types, list) or not all(isinstance(t, str) for t in avoid_types):
         return jsonify({'message': 'avoid_types must be a list of strings'}), 400
+    avoid_types_lower = frozenset(t.lower() for t in avoid_types)
+
+    paths = None
+    if polyline and isinstance(polyline, dict):
+        paths = _parse_paths(polyline.get('paths') or [])
+        if paths is None:
+            return jsonify({'message': 'polyline paths must be lists of [lon, lat] points'}), 400
 
     try:
+        score = None
+        impacted = []
+        if paths is not None:
+            score, impacted = _score_route(paths, avoid_types_lower)
+
         route_request = RouteRequest(
             user_id=current_user.id,
             start_lat=start_lat,
@@ -210,44 +344,42 @@ def plan_route(current_user):
             mode=mode,
             avoid_types=",".join(sorted({t.strip() for t in avoid_types if t.strip()}))
         )
-        db.session.add(route_request)
-        db.session.flush()
-
-        score = None
-        impacts_payload = []
         route_record = None
-
-        if polyline and isinstance(polyline, dict):
-            paths = polyline.get('paths') or []
-            score, impacted = _score_route(paths, avoid_types)
+        if paths is not None:
             route_record = Route(
-                request_id=route_request.id,
-                polyline=json.dumps(polyline),
+                polyline=orjson.dumps(polyline).decode('utf-8'),
                 score=score if score is not None else 100
             )
-            db.session.add(route_record)
-            db.session.flush()
-
-            for event, impact_score, distance_km in impacted:
-                link = RouteEventLink(
-                    event_id=event.id,
-                    route_id=route_record.id,
-                    impact_score=impact_score
-                )
-                db.session.add(link)
-                impacts_payload.append({
-                    'event_id': event.id,
-                    'type': event.type,
-                    'severity': event.severity,
-                    'distance_km': round(distance_km, 3),
-                    'impact_score': impact_score
-                })
+            route_request.result_route = route_record
+        db.session.add(route_request)
+        # A single flush inserts the request and its route; ids are read before commit
+        db.session.flush()
+        request_id = route_request.id
+        route_id = route_record.id if route_record else None
+
+        links = []
+        impacts_payload = []
+        for event, impact_score, distance_km in impacted:
+            links.append({
+                'event_id': event.id,
+                'route_id': route_id,
+                'impact_score': impact_score
+            })
+            impacts_payload.append({
+                'event_id': event.id,
+                'type': event.type,
+                'severity': event.severity,
+                'distance_km': round(distance_km, 3),
+                'impact_score': impact_score
+            })
+        if links:
+            db.session.execute(insert(RouteEventLink), links)
 
         db.session.commit()
 
         return jsonify({
-            'request_id': route_request.id,
-            'route_id': route_record.id if route_record else None,
+            'request_id': request_id,
+            'route_id': route_id,
             'score': score if score is not None else 100,
             'impacts': impacts_payload
         }), 201
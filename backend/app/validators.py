@@ -1,47 +1,114 @@
+EVENT_TYPES = (
+    'accident',
+    'construction',
+    'traffic_jam',
+    'road_closure',
+    'hazard',
+    'police',
+    'other'
+)
+VALID_EVENT_TYPES = frozenset(EVENT_TYPES)
+
+EVENT_STATUSES = ('active', 'resolved', 'expired')
+VALID_STATUSES = frozenset(EVENT_STATUSES)
+
+VALID_SEVERITIES = range(1, 6)
+
+EVENT_REQUIRED_FIELDS = ('type', 'severity', 'latitude', 'longitude')
+
 def validate_coordinates(latitude, longitude):
     try:
         lat = float(latitude)
         lon = float(longitude)
         
-        if lat < -90 or lat > 90:
-            return False, "Latitude must be between -90 and 90"
+        if not -90.0 <= lat <= 90.0:
+            return False, "Latitude must be between -90 and 90", None
         
-        if lon < -180 or lon > 180:
-            return False, "Longitude must be between -180 and 180"
+        if not -180.0 <= lon <= 180.0:
+            return False, "Longitude must be between -180 and 180", None
         
-        return True, None
+        return True, None, (lat, lon)
     except (ValueError, TypeError):
-        return False, "Invalid coordinate format"
+        return False, "Invalid coordinate format", None
 
 def validate_event_type(event_type):
-    valid_types = [
-        'accident',
-        'construction',
-        'traffic_jam',
-        'road_closure',
-        'hazard',
-        'police',
-        'other'
-    ]
-    
-    if event_type not in valid_types:
-        return False, f"Invalid event type. Must be one of: {', '.join(valid_types)}"
+    if not isinstance(event_type, str) or event_type not in VALID_EVENT_TYPES:
+        return False, f"Invalid event type. Must be one of: {', '.join(EVENT_TYPES)}"
     
     return True, None
 
 def validate_severity(severity):
     try:
         sev = int(severity)
-        if sev < 1 or sev > 5:
+        if sev not in VALID_SEVERITIES:
             return False, "Severity must be between 1 and 5", None
         return True, None, sev
     except (ValueError, TypeError):
         return False, "Severity must be a number between 1 and 5", None
 
 def validate_status(status):
-    valid_statuses = ['active', 'resolved', 'expired']
+    if not isinstance(status, str) or status not in VALID_STATUSES:
+        return False, f"Invalid status. Must be one of: {', '.join(EVENT_STATUSES)}"
+    
+    return True, None
+
+def validate_latitude(latitude):
+    try:
+        lat = float(latitude)
+        if not -90.0 <= lat <= 90.0:
+            return False, "Latitude must be between -90 and 90", None
+        return True, None, lat
+    except (ValueError, TypeError):
+        return False, "Invalid latitude format", None
+
+def validate_longitude(longitude):
+    try:
+        lon = float(longitude)
+        if not -180.0 <= lon <= 180.0:
+            return False, "Longitude must be between -180 and 180", None
+        return True, None, lon
+    except (ValueError, TypeError):
+        return False, "Invalid longitude format", None
+
+def validate_event_payload(data, partial=False):
+    """
+    Validate an event payload in one pass. A create payload must contain all
+    of EVENT_REQUIRED_FIELDS; with partial=True (updates) only the fields
+    present are checked, status included.
+    Returns (ok, message, fields) where fields holds the parsed values.
+    """
+    if not partial:
+        for field in EVENT_REQUIRED_FIELDS:
+            if field not in data:
+                return False, f"Missing required field: {field}", None
+    
+    fields = {}
+    
+    if 'type' in data:
+        valid, message = validate_event_type(data['type'])
+        if not valid:
+            return False, message, None
+        fields['type'] = data['type']
+    
+    if 'severity' in data:
+        valid, message, fields['severity'] = validate_severity(data['severity'])
+        if not valid:
+            return False, message, None
+    
+    if partial and 'status' in data:
+        valid, message = validate_status(data['status'])
+        if not valid:
+            return False, message, None
+        fields['status'] = data['status']
+    
+    if 'latitude' in data:
+        valid, message, fields['latitude'] = validate_latitude(data['latitude'])
+        if not valid:
+            return False, message, None
     
-    if status not in valid_statuses:
-        return False, f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
+    if 'longitude' in data:
+        valid, message, fields['longitude'] = validate_longitude(data['longitude'])
+        if not valid:
+            return False, message, None
     
-    return True, None
\ No newline at end of file
+    return True, None, fields
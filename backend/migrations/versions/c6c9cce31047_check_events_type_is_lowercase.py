@@ -0,0 +1,27 @@
+"""Check events type is lowercase
+
+Revision ID: c6c9cce31047
+Revises: 5fc8b1d48bdc
+Create Date: 2026-10-14 07:54:28.575234
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6c9cce31047'
+down_revision = '5fc8b1d48bdc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('UPDATE events SET type = lower(type)')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_events_type_lowercase', 'type = lower(type)')
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_events_type_lowercase', type_='check')
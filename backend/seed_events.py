@@ -1,6 +1,7 @@
 from app import create_app, db
 from app.models import Event, EventReport
 from datetime import datetime
+from sqlalchemy import insert, select, tuple_
 
 app = create_app()
 
@@ -71,43 +72,48 @@ def seed_bucharest_events():
     print(f"Adding {len(incidents)} permanent events to Bucharest map...")
 
     with app.app_context():
-        count = 0
+        # Verificam intr-un singur query ce evenimente exista deja la aceleasi coordonate pentru a nu duplica
+        existing = set(db.session.execute(
+            select(Event.latitude, Event.longitude, Event.type)
+            .where(tuple_(Event.latitude, Event.longitude, Event.type).in_(
+                [(item['latitude'], item['longitude'], item['type']) for item in incidents]
+            ))
+        ).all())
+
+        new_events = []
         for item in incidents:
-            # Verificam daca exista deja un eveniment exact la aceleasi coordonate pentru a nu duplica
-            exists = Event.query.filter_by(
-                latitude=item['latitude'], 
-                longitude=item['longitude'], 
-                type=item['type']
-            ).first()
+            key = (item['latitude'], item['longitude'], item['type'])
+            if key in existing:
+                continue
+            existing.add(key)
+            new_events.append({
+                'type': item['type'],
+                'severity': item['severity'],
+                'latitude': item['latitude'],
+                'longitude': item['longitude'],
+                'status': 'active',
+                # expires_at=None inseamna ca nu expira niciodata
+                'expires_at': None,
+                # reported_by=None inseamna generat de sistem (sau poti pune un ID de admin daca ai)
+                'reported_by': None
+            })
 
-            if not exists:
-                # 1. Cream Evenimentul
-                event = Event(
-                    type=item['type'],
-                    severity=item['severity'],
-                    latitude=item['latitude'],
-                    longitude=item['longitude'],
-                    status='active',
-                    # expires_at=None inseamna ca nu expira niciodata
-                    expires_at=None, 
-                    # reported_by=None inseamna generat de sistem (sau poti pune un ID de admin daca ai)
-                    reported_by=None 
-                )
-                db.session.add(event)
-                db.session.flush() # Facem flush pentru a obtine ID-ul evenimentului inainte de commit
+        try:
+            if new_events:
+                # 1. Cream Evenimentele intr-un singur INSERT, cu ID-urile in ordinea listei
+                event_ids = db.session.scalars(
+                    insert(Event).returning(Event.id, sort_by_parameter_order=True),
+                    new_events
+                ).all()
 
-                # 2. Cream Meta-raportul (pentru consistenta datelor)
-                report_meta = EventReport(
-                    event_id=event.id,
-                    reports_count=1 # Consideram ca e confirmat de sistem
+                # 2. Cream Meta-rapoartele (pentru consistenta datelor)
+                # Consideram ca e confirmat de sistem
+                db.session.execute(
+                    insert(EventReport),
+                    [{'event_id': event_id, 'reports_count': 1} for event_id in event_ids]
                 )
-                db.session.add(report_meta)
-                
-                count += 1
-        
-        try:
             db.session.commit()
-            print(f"Successfully added {count} new events.")
+            print(f"Successfully added {len(new_events)} new events.")
         except Exception as e:
             db.session.rollback()
             print(f"Error adding events: {e}")
@@ -0,0 +1,18 @@
+import json
+
+from app import create_app, db
+
+
+def test_response_keys_are_sorted(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    response = app.test_client().get('/api/routes/options')
+
+    assert response.status_code == 200
+    keys = list(json.loads(response.get_data(as_text=True)))
+    assert keys == sorted(keys)
+    assert app.json.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+    assert app.json.dumps({'b': 1, 'a': 2}, sort_keys=False) == '{"b":1,"a":2}'
@@ -18,11 +18,8 @@ export interface MarkerData {
   created_at: string;
 }
 
-export interface HeatmapPoint {
-  lat: number;
-  lng: number;
-  weight: number;
-}
+// [lat, lng, weight]
+export type HeatmapPoint = [lat: number, lng: number, weight: number];
 
 export interface Event {
   id: number;